@@ -1,19 +1,84 @@
 #!/usr/bin/env python3
 """
-使用 curl 作為後端的 Notion API 包裝器
-繞過 Python SSL 問題
+使用 requests.Session 作為後端的 Notion API 包裝器
+透過連線池重用 TCP/TLS 連線，避免每次請求都重新握手
 """
 
 import os
-import json
-import subprocess
+import random
+import threading
 import time
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 
 NOTION_API_BASE = "https://api.notion.com/v1"
 
+# 連線逾時 / 讀取逾時（秒）
+REQUEST_TIMEOUT = (30, 60)
+
+# 重試等待上限（秒）
+MAX_BACKOFF = 30.0
+
+
+class TokenBucket:
+    """執行緒安全的令牌桶限速器：平均速率為 rps，允許短暫爆發至 capacity 個請求"""
+    
+    def __init__(self, rps, capacity=None):
+        self.rps = rps
+        self.capacity = capacity if capacity is not None else max(1.0, rps)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """取得一個令牌，桶內沒有令牌時等待到補充為止"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rps)
+                self._last = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                wait_time = (1 - self._tokens) / self.rps
+            
+            time.sleep(wait_time)
+
+
+# Notion 平均限制為 3 req/s（以 integration 計），所有請求共用同一個限速器
+_NOTION_LIMITER = TokenBucket(rps=2.7)
+
+
+class NotionAPIError(Exception):
+    """Notion API 回傳的錯誤，附帶 HTTP 狀態碼"""
+    
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+    
+    @property
+    def retryable(self):
+        """429 與 5xx 可重試；其餘 4xx 屬於請求本身的問題，重試無效"""
+        if self.status_code is None:
+            return True
+        return self.status_code == 429 or not 400 <= self.status_code < 500
+
+
+def backoff_time(attempt, retry_after=None):
+    """計算重試等待時間：帶抖動且有上限的指數退避，且不少於伺服器要求的 Retry-After"""
+    wait_time = min(MAX_BACKOFF, (2 ** attempt) * (1.0 + random.uniform(0, 0.5)))
+    if retry_after is not None:
+        return max(retry_after, wait_time)
+    return wait_time
+
+
 class CurlNotionClient:
-    """使用 curl 的 Notion 客戶端"""
+    """使用 requests.Session 的 Notion 客戶端（保留類別名稱以相容舊程式）"""
     
     def __init__(self, auth):
         self.auth = auth
@@ -21,109 +86,109 @@ class CurlNotionClient:
             "Authorization": f"Bearer {auth}",
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json",
-            "Connection": "close"
         }
+        
+        # 建立持久連線池（HTTP keep-alive）
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._session.mount("https://", adapter)
     
-    def _curl_request(self, method, path, data=None, max_retries=5):
-        """使用 curl 發送請求"""
+    def _request(self, method, path, data=None, max_retries=5):
+        """透過共用 session 發送請求（429/5xx/網路錯誤會重試，其餘 4xx 直接失敗）"""
         url = f"{NOTION_API_BASE}{path}"
         
         for attempt in range(max_retries):
+            retry_after = None
             try:
-                if attempt > 0:
-                    wait_time = 2 ** attempt
-                    print(f"   等待 {wait_time} 秒後重試...")
-                    time.sleep(wait_time)
-                
-                # 構建 curl 命令
-                cmd = [
-                    "curl", "-X", method,
-                    "--http1.1",
-                    "--max-time", "60",  # 增加到 60 秒
-                    "--connect-timeout", "30",  # 連接超時 30 秒
-                    "--tcp-nodelay",  # 禁用 Nagle 算法
-                    "--keepalive-time", "60"  # Keep-alive 超時
-                ]
-                
-                # 在重試時添加 verbose 模式來診斷
-                if attempt > 0:
-                    cmd.append("-v")
-                else:
-                    cmd.append("-s")
-                
-                # 添加 headers
-                for key, value in self.headers.items():
-                    cmd.extend(["-H", f"{key}: {value}"])
-                
-                # 添加 data
-                if data:
-                    json_data = json.dumps(data, ensure_ascii=False)
-                    cmd.extend(["-d", json_data])
-                
-                # 添加 URL
-                cmd.append(url)
-                
-                # 調試：打印命令（隱藏敏感信息）
-                if attempt == 0:
-                    debug_cmd = [c if "Bearer" not in str(c) else "[HIDDEN]" for c in cmd]
-                    print(f"   執行 curl: {' '.join(debug_cmd[:8])}... {url}")
-                    if data:
-                        # 打印數據大小
-                        json_size = len(json.dumps(data, ensure_ascii=False))
-                        print(f"   數據大小: {json_size} bytes")
-                        if json_size > 10000:
-                            print(f"   ⚠️ 警告：數據較大可能導致問題")
-                
-                # 執行命令
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=65  # 增加到 65 秒
+                _NOTION_LIMITER.acquire()
+                response = self._session.request(
+                    method,
+                    url,
+                    data=orjson.dumps(data) if data is not None else None,
+                    timeout=REQUEST_TIMEOUT
                 )
-                
-                if result.returncode == 0:
-                    try:
-                        response = json.loads(result.stdout)
-                    except json.JSONDecodeError as e:
-                        raise Exception(f"JSON 解析失敗: {result.stdout[:200]}")
-                    
-                    # 檢查是否有錯誤
-                    if "object" in response and response["object"] == "error":
-                        raise Exception(f"API Error: {response.get('message', 'Unknown error')}")
+                return self._parse_response(response)
                     
-                    return response
-                else:
-                    # 獲取更詳細的錯誤信息
-                    error_msg = result.stderr if result.stderr else "無錯誤信息"
-                    stdout_msg = result.stdout[:200] if result.stdout else ""
-                    full_error = f"stdout: {stdout_msg}, stderr: {error_msg[:200]}"
-                    raise Exception(f"curl 返回碼 {result.returncode}: {full_error}")
-                    
-            except subprocess.TimeoutExpired:
-                if attempt < max_retries - 1:
-                    print(f"   ⚠️ 請求超時 (嘗試 {attempt + 1}/{max_retries})")
-                else:
+            except NotionAPIError as e:
+                if not e.retryable or attempt == max_retries - 1:
+                    raise
+                retry_after = e.retry_after
+                print(f"   ⚠️ 請求失敗 (嘗試 {attempt + 1}/{max_retries}): {e}")
+            except requests.Timeout:
+                if attempt == max_retries - 1:
                     raise Exception("請求超時")
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"   ⚠️ 請求失敗 (嘗試 {attempt + 1}/{max_retries}): {e}")
-                else:
+                print(f"   ⚠️ 請求超時 (嘗試 {attempt + 1}/{max_retries})")
+            except requests.RequestException as e:
+                if attempt == max_retries - 1:
                     raise
+                print(f"   ⚠️ 請求失敗 (嘗試 {attempt + 1}/{max_retries}): {e}")
+            
+            wait_time = backoff_time(attempt + 1, retry_after)
+            print(f"   等待 {wait_time:.1f} 秒後重試...")
+            time.sleep(wait_time)
         
         raise Exception("所有重試都失敗")
     
+    @staticmethod
+    def _parse_response(response):
+        """解析回應，HTTP 錯誤或 Notion 錯誤物件轉為 NotionAPIError"""
+        status_code = response.status_code
+        try:
+            result = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            raise NotionAPIError(
+                f"JSON 解析失敗 (HTTP {status_code}): {response.text[:200]}",
+                status_code
+            )
+        
+        # 檢查是否有錯誤
+        if status_code >= 400 or result.get("object") == "error":
+            retry_after = None
+            if status_code == 429:
+                try:
+                    retry_after = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    pass
+            raise NotionAPIError(
+                f"API Error (HTTP {status_code}): {result.get('message', 'Unknown error')}",
+                status_code,
+                retry_after
+            )
+        
+        return result
+    
     def users_me(self):
         """獲取當前用戶信息"""
-        return self._curl_request("GET", "/users/me")
+        return self._request("GET", "/users/me")
+    
+    def databases_query(self, database_id, start_cursor=None, page_size=100, query_filter=None):
+        """查詢數據庫（單頁）"""
+        data = {"page_size": page_size}
+        if start_cursor:
+            data["start_cursor"] = start_cursor
+        if query_filter:
+            data["filter"] = query_filter
+        return self._request("POST", f"/databases/{database_id}/query", data=data)
     
-    def databases_query(self, database_id):
-        """查詢數據庫"""
-        return self._curl_request("POST", f"/databases/{database_id}/query", data={})
+    def databases_query_iter(self, database_id, query_filter=None):
+        """逐頁查詢數據庫，依序產生每筆結果（不需一次保留所有分頁）"""
+        start_cursor = None
+        while True:
+            response = self.databases_query(
+                database_id,
+                start_cursor=start_cursor,
+                query_filter=query_filter
+            )
+            yield from response.get("results", [])
+            
+            if not response.get("has_more"):
+                return
+            start_cursor = response.get("next_cursor")
     
     def databases_retrieve(self, database_id):
         """獲取數據庫信息"""
-        return self._curl_request("GET", f"/databases/{database_id}")
+        return self._request("GET", f"/databases/{database_id}")
     
     def pages_create(self, parent, properties, children=None):
         """創建頁面"""
@@ -134,31 +199,31 @@ class CurlNotionClient:
         if children:
             data["children"] = children
         
-        return self._curl_request("POST", "/pages", data=data)
+        return self._request("POST", "/pages", data=data)
     
     def pages_update(self, page_id, properties):
         """更新頁面屬性"""
         data = {"properties": properties}
-        return self._curl_request("PATCH", f"/pages/{page_id}", data=data)
+        return self._request("PATCH", f"/pages/{page_id}", data=data)
     
     def blocks_children_list(self, block_id):
         """列出子區塊"""
-        return self._curl_request("GET", f"/blocks/{block_id}/children")
+        return self._request("GET", f"/blocks/{block_id}/children")
     
     def blocks_delete(self, block_id):
         """刪除區塊"""
-        return self._curl_request("DELETE", f"/blocks/{block_id}")
+        return self._request("DELETE", f"/blocks/{block_id}")
     
     def blocks_children_append(self, block_id, children):
         """添加子區塊"""
         data = {"children": children}
-        return self._curl_request("PATCH", f"/blocks/{block_id}/children", data=data)
+        return self._request("PATCH", f"/blocks/{block_id}/children", data=data)
 
 
 def test_curl_client():
-    """測試 curl 客戶端"""
+    """測試 Notion 客戶端"""
     print("=" * 60)
-    print("🧪 測試 curl 客戶端")
+    print("🧪 測試 Notion 客戶端")
     print("=" * 60)
     
     api_key = os.environ.get("NOTION_API_KEY")
@@ -191,7 +256,7 @@ def test_curl_client():
         print(f"   現有頁面數: {len(results.get('results', []))}")
         
         print("\n" + "=" * 60)
-        print("✅ 所有測試通過！可以使用 curl 客戶端")
+        print("✅ 所有測試通過！可以使用 Notion 客戶端")
         print("=" * 60)
         return True
         
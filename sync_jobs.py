@@ -4,11 +4,16 @@ Anduril 台北/東京職缺自動同步腳本
 自動抓取 Anduril 職缺頁面並更新到 Notion 資料庫
 """
 
+import hashlib
+import ijson
 import os
 import re
-import time
+import orjson
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from curl_notion_client import CurlNotionClient
 from dotenv import load_dotenv
 
@@ -29,82 +34,109 @@ TARGET_LOCATIONS = {
     "japan": "Tokyo Japan",
 }
 
+# 預先編譯：地點關鍵字比對（大部分非目標職缺只需一次掃描即可排除）
+_LOCATION_RE = re.compile("|".join(map(re.escape, TARGET_LOCATIONS)), re.IGNORECASE)
+
+# 預先編譯：從職缺標題提取經驗年數
+_YEARS_RE = re.compile(r"(\d+)\+?\s*years?", re.IGNORECASE)
+
+# 清理文本時要移除的控制字符（保留 \t \n \r）
+_CONTROL_CHARS_TABLE = {c: None for c in range(32) if c not in (9, 10, 13)}
+
+# 計算內容雜湊時納入的職缺欄位（即所有寫入 Notion 的同步欄位，含職缺更新時間）
+CONTENT_HASH_FIELDS = ("title", "department", "location", "experience", "apply_url", "updated_at")
+
+# 共用的 HTTP session（整個腳本重用同一組 keep-alive 連線，429/5xx 自動指數退避重試）
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=8,
+        backoff_factor=1.0,
+        backoff_max=30,
+        backoff_jitter=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+    ),
+))
+
 # 從環境變數讀取
 NOTION_API_KEY = os.environ.get("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.environ.get("NOTION_DATABASE_ID")
 
 
 
-# 重試設定
-MAX_RETRIES = 3
-RETRY_DELAY = 2  # 秒（增加到 10 秒）
-REQUEST_DELAY = 1  # 每個請求之間的延遲（增加到 3 秒）
+# 現有職缺快取（GitHub Actions 透過 actions/cache 保留，下次同步時只查詢變動的頁面）
+SYNC_CACHE_PATH = ".sync_cache.json"
+SYNC_CACHE_MAX_AGE_DAYS = 30
+# 快取格式版本（快取欄位有變動時遞增，舊格式的快取會被捨棄並重新完整查詢）
+SYNC_CACHE_VERSION = 1
+SYNC_CACHE_JOB_FIELDS = ("page_id", "content_hash", "note")
+
+# 已關閉職缺寫入「備註」欄位的標記
+CLOSED_MARKER = "⚠️ 職缺可能已關閉"
+
+# 同時寫入 Notion 的執行緒數（Notion 平均限制約 3 req/s）
+NOTION_MAX_WORKERS = 4
+
+
+def iter_greenhouse_jobs():
+    """串流解析 Greenhouse 職缺列表，逐筆產生職缺（不需一次載入所有職缺的 HTML 內容）"""
+    # 使用 content=true 一次取回所有欄位（含部門），不需再逐一請求職缺詳細內容
+    with _SESSION.get(
+        GREENHOUSE_API_BASE,
+        params={"content": "true"},
+        stream=True,
+        timeout=30
+    ) as response:
+        response.raise_for_status()
+        # 讓 urllib3 先解開 gzip 等壓縮編碼再交給 ijson
+        response.raw.decode_content = True
+        yield from ijson.items(response.raw, "jobs.item")
 
 
 def get_jobs_from_greenhouse():
-    """從 Greenhouse API 獲取職缺列表（優化流量版本）"""
+    """從 Greenhouse API 獲取職缺列表（單次請求版本）"""
     jobs = []
 
     try:
-        # 步驟 1: 先獲取職缺列表（不含詳細內容）- 節省流量
         print("📋 正在獲取職缺列表...")
-        response = requests.get(GREENHOUSE_API_BASE)
-        response.raise_for_status()
-        data = response.json()
-        
-        all_jobs = data.get("jobs", [])
-        print(f"📊 API 回傳 {len(all_jobs)} 個職缺")
-
-        # 步驟 2: 篩選出目標地區的職缺
-        target_job_ids = []
-        target_job_basic = []
-        
-        for job in all_jobs:
+        total = 0
+
+        # 篩選出目標地區的職缺（邊下載邊解析，非目標職缺的內容不會累積在記憶體中）
+        for job in iter_greenhouse_jobs():
+            total += 1
             location = job.get("location", {}).get("name", "")
-            location_lower = location.lower()
             
-            # 檢查是否匹配任何目標地點
-            if any(keyword in location_lower for keyword in TARGET_LOCATIONS.keys()):
-                target_job_ids.append(job.get("id"))
-                target_job_basic.append(job)
-        
-        print(f"🎯 找到 {len(target_job_ids)} 個目標地區職缺")
-
-        # 步驟 3: 只獲取目標職缺的詳細內容
-        for i, job_id in enumerate(target_job_ids, 1):
-            try:
-                print(f"  📥 正在獲取職缺 {i}/{len(target_job_ids)} 的詳細內容...")
-                detail_response = requests.get(f"{GREENHOUSE_API_BASE}/{job_id}")
-                detail_response.raise_for_status()
-                job_detail = detail_response.json()
-                
-                # 取得基本資訊
-                basic_info = target_job_basic[i-1]
-                location = basic_info.get("location", {}).get("name", "")
-                
-                # 簡化版：不解析內文，只提取基本經驗要求
-                # 從職缺標題或基本資訊中推斷經驗（如果有的話）
-                title = job_detail.get("title", "")
-                experience = extract_experience_from_title(title)
-
-                # 提取部門
-                departments = job_detail.get("departments", [])
-                department = departments[0].get("name", "Unknown") if departments else "Unknown"
-
-                jobs.append({
-                    "id": str(job_detail.get("id", "")),
-                    "title": job_detail.get("title", ""),
-                    "location": location,
-                    "department": department,
-                    "apply_url": job_detail.get("absolute_url", ""),
-                    "experience": experience,
-                    "updated_at": job_detail.get("updated_at", ""),
-                })
-                
-            except Exception as e:
-                print(f"  ⚠️ 獲取職缺 {job_id} 詳細內容失敗: {e}")
+            # 檢查是否匹配任何目標地點，並順便取得標準地點名稱
+            location_normalized = normalize_location(location)
+            if not location_normalized:
                 continue
 
+            # 簡化版：不解析內文，只提取基本經驗要求
+            # 從職缺標題或基本資訊中推斷經驗（如果有的話）
+            title = job.get("title", "")
+            experience = extract_experience_from_title(title)
+
+            # 提取部門
+            departments = job.get("departments", [])
+            department = departments[0].get("name", "Unknown") if departments else "Unknown"
+
+            job_info = {
+                "id": str(job.get("id", "")),
+                "title": title,
+                "location": location,
+                "location_normalized": location_normalized,
+                "department": department,
+                "apply_url": job.get("absolute_url", ""),
+                "experience": experience,
+                "updated_at": job.get("updated_at", ""),
+            }
+            job_info["content_hash"] = compute_content_hash(job_info)
+            jobs.append(job_info)
+
+        print(f"📊 API 回傳 {total} 個職缺")
         print(f"✅ 成功獲取 {len(jobs)} 個職缺（台北/東京）")
         return jobs
 
@@ -113,6 +145,25 @@ def get_jobs_from_greenhouse():
         return []
 
 
+def normalize_location(location):
+    """標準化地點名稱，不符合任何目標地點時回傳 None"""
+    matched = {m.lower() for m in _LOCATION_RE.findall(location)}
+    if not matched:
+        return None
+
+    # 同時包含多個地點時（例如 "Tokyo, Japan; Taipei, Taiwan"），依 TARGET_LOCATIONS 的順序優先
+    for keyword, standard_name in TARGET_LOCATIONS.items():
+        if keyword in matched:
+            return standard_name
+
+
+def compute_content_hash(job):
+    """計算職缺同步欄位的內容雜湊（任何同步欄位變動都會改變）"""
+    content = {key: job.get(key, "") for key in CONTENT_HASH_FIELDS}
+    payload = orjson.dumps(content, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
 def extract_experience_from_title(title):
     """從職缺標題中提取經驗年數要求"""
     if not title:
@@ -131,121 +182,158 @@ def extract_experience_from_title(title):
         return "學生/實習"
 
     # 嘗試從標題中直接提取數字
-    match = re.search(r"(\d+)\+?\s*years?", title, re.IGNORECASE)
+    match = _YEARS_RE.search(title)
     if match:
         return f"{match.group(1)}+ years"
 
     return "未指定"
 
 
+def read_text_property(props, name, kind="rich_text"):
+    """讀取 title/rich_text 屬性的第一段文字，欄位不存在或為空時回傳空字串"""
+    try:
+        return props[name][kind][0]["text"]["content"]
+    except (KeyError, IndexError):
+        return ""
+
+
+def load_sync_cache(database_id):
+    """載入上次同步的現有職缺快取，不存在、格式不符、資料庫不符或過期時回傳 None"""
+    try:
+        with open(SYNC_CACHE_PATH, "rb") as f:
+            cache = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+    if not isinstance(cache, dict) or cache.get("version") != SYNC_CACHE_VERSION:
+        return None
+
+    if cache.get("database_id") != database_id:
+        return None
+
+    jobs = cache.get("jobs")
+    if not isinstance(jobs, dict) or not all(
+        isinstance(entry, dict) and all(field in entry for field in SYNC_CACHE_JOB_FIELDS)
+        for entry in jobs.values()
+    ):
+        return None
+
+    try:
+        synced_at = datetime.fromisoformat(cache["synced_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    # 快取無法得知被刪除的頁面，定期完整重新查詢一次
+    if datetime.now(timezone.utc) - synced_at > timedelta(days=SYNC_CACHE_MAX_AGE_DAYS):
+        return None
+
+    return cache
+
+
+def save_sync_cache(database_id, synced_at, existing):
+    """儲存現有職缺快取，供下次同步只查詢變動的頁面"""
+    cache = {
+        "version": SYNC_CACHE_VERSION,
+        "database_id": database_id,
+        "synced_at": synced_at.isoformat(),
+        "jobs": existing,
+    }
+    try:
+        with open(SYNC_CACHE_PATH, "wb") as f:
+            f.write(orjson.dumps(cache))
+    except OSError as e:
+        print(f"⚠️ 寫入同步快取失敗: {e}")
+
+
+def invalidate_sync_cache():
+    """刪除同步快取，下次同步改為完整查詢"""
+    try:
+        os.remove(SYNC_CACHE_PATH)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️ 刪除同步快取失敗: {e}")
+
+
 def get_existing_jobs_from_notion(notion, database_id):
-    """獲取 Notion 資料庫中現有的職缺（含重試）"""
-    existing = {}
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            # 使用 curl 客戶端查詢數據庫
-            results = notion.databases_query(database_id)
-
-            for page in results.get("results", []):
-                props = page.get("properties", {})
-
-                # 獲取 REQ ID 作為唯一識別符
-                req_id_prop = props.get("REQ ID", {})
-                rich_text = req_id_prop.get("rich_text", [])
-                if rich_text and len(rich_text) > 0:
-                    req_id = rich_text[0].get("text", {}).get("content", "")
-                    if req_id:
-                        # 提取標題
-                        title_prop = props.get("職位名稱", {})
-                        title_text = title_prop.get("title", [])
-                        title = title_text[0].get("text", {}).get("content", "") if title_text else ""
-                        
-                        # 提取更新時間（從頁面的 last_edited_time）
-                        updated_at = page.get("last_edited_time", "")
-                        
-                        existing[req_id] = {
-                            "page_id": page["id"],
-                            "properties": props,
-                            "title": title,
-                            "updated_at": updated_at
-                        }
-
-            print(f"📋 Notion 中現有 {len(existing)} 個職缺")
-            return existing
-
-        except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                print(f"⚠️ 獲取 Notion 資料失敗 (嘗試 {attempt + 1}/{MAX_RETRIES}): {e}")
-                print(f"   等待 {RETRY_DELAY} 秒後重試...")
-                time.sleep(RETRY_DELAY)
-            else:
-                print(f"❌ 獲取 Notion 資料失敗（已達最大重試次數）: {e}")
-                return {}
-
-
-def create_job_page(notion, database_id, job):
-    """在 Notion 建立新職缺頁面（簡化版：只建立屬性，不添加內容）"""
+    """獲取 Notion 資料庫中現有的職缺（有快取時只查詢上次同步後編輯過的頁面）"""
+    # Notion 的 last_edited_time 只精確到分鐘，查詢起點取整到分鐘以免漏掉頁面
+    query_started = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+    cache = load_sync_cache(database_id)
+    if cache:
+        existing = cache["jobs"]
+        query_filter = {
+            "timestamp": "last_edited_time",
+            "last_edited_time": {"on_or_after": cache["synced_at"]},
+        }
+        print(f"💾 載入快取 {len(existing)} 個職缺，只查詢 {cache['synced_at']} 後的變動")
+    else:
+        existing = {}
+        query_filter = None
 
-    # 清理並準備屬性
-    def clean_text(text, max_len=None):
-        """清理文本，移除可能導致問題的字符"""
-        if not text:
-            return ""
-        # 移除控制字符和零寬字符
-        text = ''.join(char for char in text if ord(char) >= 32 or char in '\n\r\t')
-        if max_len:
-            text = text[:max_len]
-        return text
+    try:
+        # 逐頁查詢數據庫（超過 100 筆時自動翻頁；重試由 Notion client 處理）
+        for page in notion.databases_query_iter(database_id, query_filter=query_filter):
+            props = page["properties"]
 
-    properties = {
-        "職位名稱": {
-            "title": [
-                {
-                    "text": {
-                        "content": clean_text(job["title"], 100)
-                    }
-                }
-            ]
-        },
-        "部門": {
-            "select": {
-                "name": clean_text(normalize_department(job["department"]), 100)
-            }
-        },
-        "地點": {
-            "select": {
-                "name": clean_text(normalize_location(job["location"]), 100)
-            }
-        },
-        "REQ ID": {
-            "rich_text": [
-                {
-                    "text": {
-                        "content": clean_text(job["id"], 100)
-                    }
-                }
-            ]
-        },
-        "經驗要求": {
-            "rich_text": [
-                {
-                    "text": {
-                        "content": clean_text(job["experience"], 100)
-                    }
-                }
-            ]
-        },
-        "申請狀態": {
-            "select": {
-                "name": "尚未申請"
-            }
-        },
-        "新增日期": {
-            "date": {
-                "start": datetime.now().strftime("%Y-%m-%d")
+            # 獲取 REQ ID 作為唯一識別符（缺少時跳過）
+            req_id = read_text_property(props, "REQ ID")
+            if not req_id:
+                continue
+
+            existing[req_id] = {
+                "page_id": page["id"],
+                # 內容雜湊（由同步腳本寫入的欄位，用於判斷是否需要更新）
+                "content_hash": read_text_property(props, "內容雜湊"),
+                "note": read_text_property(props, "備註"),
             }
-        },
+
+        print(f"📋 Notion 中現有 {len(existing)} 個職缺")
+        save_sync_cache(database_id, query_started, existing)
+        return existing
+
+    except Exception as e:
+        print(f"❌ 獲取 Notion 資料失敗（已達最大重試次數）: {e}")
+        return {}
+
+
+def clean_text(text, max_len=None):
+    """清理文本，移除可能導致問題的字符"""
+    if not text:
+        return ""
+    # 移除控制字符（保留 \t \n \r），單次 C 層級轉換
+    text = text.translate(_CONTROL_CHARS_TABLE)
+    if max_len:
+        text = text[:max_len]
+    return text
+
+
+def title_property(content):
+    """建立 Notion title 屬性值"""
+    return {"title": [{"text": {"content": content}}]}
+
+
+def rich_text_property(content):
+    """建立 Notion rich_text 屬性值"""
+    return {"rich_text": [{"text": {"content": content}}]}
+
+
+def select_property(name):
+    """建立 Notion select 屬性值"""
+    return {"select": {"name": name}}
+
+
+def build_job_properties(job):
+    """建立由同步腳本維護的職缺屬性（新增與更新共用，不含申請狀態等個人欄位）"""
+    properties = {
+        "職位名稱": title_property(clean_text(job["title"], 100)),
+        "部門": select_property(clean_text(normalize_department(job["department"]))),
+        "地點": select_property(job["location_normalized"]),
+        "REQ ID": rich_text_property(clean_text(job["id"], 100)),
+        "經驗要求": rich_text_property(clean_text(job["experience"], 100)),
+        "職缺更新時間": rich_text_property(clean_text(job.get("updated_at", ""), 100)),
+        "內容雜湊": rich_text_property(job["content_hash"]),
     }
 
     # URL 字段單獨處理，確保有效
@@ -255,60 +343,48 @@ def create_job_page(notion, database_id, job):
         # 如果 URL 無效，使用預設 URL
         properties["申請連結"] = {"url": "https://www.anduril.com"}
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            # 在每次嘗試前加入延遲（除了第一次）
-            if attempt > 0:
-                print(f"     等待 {RETRY_DELAY} 秒後重試...")
-                time.sleep(RETRY_DELAY)
+    return properties
 
-            # 創建頁面（只有屬性，不帶內容）
-            page = notion.pages_create(
-                parent={"database_id": database_id},
-                properties=properties
-            )
 
-            print(f"  ✅ 新增: {job['title']}")
-            time.sleep(REQUEST_DELAY)
-            return page
+def create_job_page(notion, database_id, job, today):
+    """在 Notion 建立新職缺頁面（簡化版：只建立屬性，不添加內容）"""
 
-        except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                print(f"  ⚠️ 新增失敗 {job['title']} (嘗試 {attempt + 1}/{MAX_RETRIES}): {e}")
-            else:
-                print(f"  ❌ 新增失敗 {job['title']}（已達最大重試次數）: {e}")
-                return None
+    try:
+        # 清理並準備屬性（資料異常時同樣記錄為新增失敗）
+        properties = build_job_properties(job)
+        properties["申請狀態"] = select_property("尚未申請")
+        properties["新增日期"] = {"date": {"start": today}}
 
+        # 創建頁面（只有屬性，不帶內容；429/5xx 的退避重試由 Notion client 處理）
+        page = notion.pages_create(
+            parent={"database_id": database_id},
+            properties=properties
+        )
 
-def update_job_page(notion, page_id, job):
-    """更新現有職缺頁面（簡化版：只更新屬性，不更新內容）"""
+        print(f"  ✅ 新增: {job['title']}")
+        return page
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            # 只更新基本屬性（標題、部門、地點等可能不會改變，這裡可選擇性更新）
-            # 主要更新可能變化的欄位
-            properties = {}
+    except Exception as e:
+        print(f"  ❌ 新增失敗 {job['title']}（已達最大重試次數）: {e}")
+        return None
 
-            # 如果需要更新特定欄位，可以在這裡添加
-            # 例如：更新申請狀態或其他欄位
 
-            # 如果有需要更新的屬性，才執行更新
-            if properties:
-                notion.pages_update(
-                    page_id=page_id,
-                    properties=properties
-                )
+def update_job_page(notion, page_id, job):
+    """更新現有職缺頁面（簡化版：只更新屬性，不更新內容），回傳是否成功"""
 
-            print(f"  🔄 更新: {job['title']}")
-            return
+    try:
+        # 寫回所有同步欄位（含更新時間與內容雜湊），申請狀態、備註等個人欄位不會被覆蓋
+        notion.pages_update(
+            page_id=page_id,
+            properties=build_job_properties(job)
+        )
 
-        except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                print(f"  ⚠️ 更新失敗 {job['title']} (嘗試 {attempt + 1}/{MAX_RETRIES}): {e}")
-                print(f"     等待 {RETRY_DELAY} 秒後重試...")
-                time.sleep(RETRY_DELAY)
-            else:
-                print(f"  ❌ 更新失敗 {job['title']}（已達最大重試次數）: {e}")
+        print(f"  🔄 更新: {job['title']}")
+        return True
+
+    except Exception as e:
+        print(f"  ❌ 更新失敗 {job['title']}（已達最大重試次數）: {e}")
+        return False
 
 
 def normalize_department(dept):
@@ -323,41 +399,46 @@ def normalize_department(dept):
         return dept[:100]  # Notion 限制
 
 
-def normalize_location(location):
-    """標準化地點名稱"""
-    location_lower = location.lower()
-    
-    # 根據關鍵字映射到標準地點名稱
-    for keyword, standard_name in TARGET_LOCATIONS.items():
-        if keyword in location_lower:
-            return standard_name
-    
-    # 如果沒有匹配，返回原始地點（截斷）
-    return location[:100]  # Notion 限制
+def mark_removed_job(notion, req_id, page_id, today):
+    """標記單一已移除的職缺，回傳是否成功"""
+    try:
+        # 更新備註欄位
+        notion.pages_update(
+            page_id=page_id,
+            properties={
+                "備註": rich_text_property(f"{CLOSED_MARKER} ({today})")
+            }
+        )
+        print(f"  ⚠️ 標記已關閉: REQ ID {req_id}")
+        return True
+    except Exception as e:
+        print(f"  ❌ 標記失敗: {e}")
+        return False
 
 
-def mark_removed_jobs(notion, existing_jobs, current_job_ids):
-    """標記已移除的職缺"""
-    for req_id, data in existing_jobs.items():
-        if req_id not in current_job_ids:
-            try:
-                # 更新備註欄位
-                notion.pages_update(
-                    page_id=data["page_id"],
-                    properties={
-                        "備註": {"rich_text": [{"text": {"content": f"⚠️ 職缺可能已關閉 ({datetime.now().strftime('%Y-%m-%d')})"}}]}
-                    }
-                )
-                print(f"  ⚠️ 標記已關閉: REQ ID {req_id}")
-            except Exception as e:
-                print(f"  ❌ 標記失敗: {e}")
+def mark_removed_jobs(notion, existing_jobs, current_job_ids, today, executor):
+    """標記已移除的職缺（各頁面互不相依，交給共用的 executor 並行更新）"""
+    # 已標記過的頁面不再重複更新，重複執行同步不會產生多餘請求
+    stale_ids = [
+        req_id for req_id in existing_jobs.keys() - current_job_ids
+        if not existing_jobs[req_id]["note"].startswith(CLOSED_MARKER)
+    ]
+
+    return [
+        executor.submit(mark_removed_job, notion, req_id, existing_jobs[req_id]["page_id"], today)
+        for req_id in stale_ids
+    ]
 
 
 def main():
     """主程式"""
+    # 本次同步的時間戳記只取一次，所有頁面使用相同日期
+    run_time = datetime.now()
+    today = run_time.strftime("%Y-%m-%d")
+
     print("=" * 50)
     print("🚀 Anduril 台北/東京職缺同步開始")
-    print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"⏰ {run_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
 
     # 驗證環境變數
@@ -378,11 +459,10 @@ def main():
     if not api_key.startswith('secret_') and not api_key.startswith('ntn_'):
         print("⚠️ 警告: NOTION_API_KEY 格式可能不正確，正常格式應以 'secret_' 或 'ntn_' 開頭")
 
-    # 初始化 Notion client（使用 curl 後端）
+    # 初始化 Notion client（使用 requests.Session 連線池）
     try:
-        # 使用 curl 客戶端來繞過 Python SSL 問題
         notion = CurlNotionClient(auth=api_key)
-        print("✅ Notion client 初始化成功 (使用 curl 後端)")
+        print("✅ Notion client 初始化成功 (使用連線池)")
     except Exception as e:
         print(f"❌ 初始化 Notion client 失敗: {e}")
         return 1
@@ -396,33 +476,61 @@ def main():
     # 獲取現有 Notion 資料
     existing_jobs = get_existing_jobs_from_notion(notion, NOTION_DATABASE_ID)
 
-    # 在查詢後等待一下再開始新增/更新操作
-    print("\n⏳ 等待 1 秒後開始同步...")
-    time.sleep(1)
-
-    # 同步職缺
-    current_req_ids = set()
-    for job in jobs:
-        req_id = job["id"]
-        current_req_ids.add(req_id)
-
-        if req_id in existing_jobs:
-            # 檢查是否需要更新
-            existing_title = existing_jobs[req_id].get("title", "")
-            existing_updated = existing_jobs[req_id].get("updated_at", "")
-
-            if (job["title"] != existing_title or
-                job.get("updated_at", "") != existing_updated):
-                # 內容有變化，更新頁面
-                update_job_page(notion, existing_jobs[req_id]["page_id"], job)
-            else:
-                print(f"  ⏭️  跳過（無變化）: {job['title']}")
-        else:
-            # 新增職缺
-            create_job_page(notion, NOTION_DATABASE_ID, job)
-
-    # 標記已移除的職缺
-    mark_removed_jobs(notion, existing_jobs, current_req_ids)
+    # 先以集合運算將職缺分為新增 / 更新 / 跳過
+    fetched_ids = {job["id"] for job in jobs}
+    existing_ids = existing_jobs.keys() & fetched_ids
+
+    to_create = [job for job in jobs if job["id"] not in existing_ids]
+    # 只比對內容雜湊：雜湊涵蓋所有同步欄位（含 updated_at），相同時不需更新
+    to_update = [
+        job for job in jobs
+        if job["id"] in existing_ids
+        and job["content_hash"] != existing_jobs[job["id"]]["content_hash"]
+    ]
+    print(f"📊 新增 {len(to_create)} 個、更新 {len(to_update)} 個、"
+          f"跳過 {len(existing_ids) - len(to_update)} 個（無變化）")
+
+    # 同步職缺與標記已移除的職缺共用同一組工作執行緒
+    # 所有 Notion 請求都經過 client 的令牌桶限速，總速率不會超過上限
+    with ThreadPoolExecutor(max_workers=NOTION_MAX_WORKERS) as executor:
+        create_futures = [
+            executor.submit(create_job_page, notion, NOTION_DATABASE_ID, job, today)
+            for job in to_create
+        ]
+        # 寫入現有頁面的工作（頁面 ID 可能來自快取）
+        existing_page_futures = [
+            executor.submit(update_job_page, notion, existing_jobs[job["id"]]["page_id"], job)
+            for job in to_update
+        ]
+        existing_page_futures += mark_removed_jobs(
+            notion, existing_jobs, fetched_ids, today, executor
+        )
+
+    # 取回每個工作的結果，工作執行緒中未預期的例外不會被默默吞掉
+    errors = 0
+    existing_page_failed = False
+    for futures, writes_existing_page in ((create_futures, False), (existing_page_futures, True)):
+        for future in futures:
+            try:
+                succeeded = future.result()
+            except Exception as e:
+                errors += 1
+                succeeded = False
+                print(f"  ❌ 同步工作發生未預期錯誤: {e}")
+            if writes_existing_page and not succeeded:
+                existing_page_failed = True
+
+    # 增量查詢不會回傳已封存或刪除的頁面，快取中可能留著失效的頁面 ID；
+    # 寫入現有頁面失敗時捨棄快取，下次同步重新完整查詢（被刪除的職缺會重新建立）
+    if existing_page_failed:
+        print("⚠️ 部分現有頁面寫入失敗，已清除同步快取，下次將完整查詢 Notion")
+        invalidate_sync_cache()
+
+    if errors:
+        print("=" * 50)
+        print(f"❌ 同步結束，但有 {errors} 個工作發生錯誤")
+        print("=" * 50)
+        return 1
 
     print("=" * 50)
     print("✅ 同步完成!")